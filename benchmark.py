@@ -0,0 +1,501 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import logging
+
+logger = logging.getLogger(__file__)
+logger.info("Loading benchmark module")
+
+from collections import namedtuple
+from contextlib import ExitStack
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+from time import perf_counter, sleep
+import types
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+import psutil
+
+_FIXTURES = os.path.join(os.path.dirname(__file__), "res/fixtures/")
+"""Directory containing the fixtures."""
+_PROC_FILES = ("stat", "meminfo", "net/dev")
+"""Files under /proc that are read by the profiler, and thus recorded."""
+_GPIO_DRIVERS = "/sys/bus/platform/drivers/gpiomem-bcm2835"
+"""Path checked by the display module to find the GPIO drivers."""
+
+# Lightweight stand-ins for psutil's return values, with the same fields
+_Temperature = namedtuple("_Temperature", ("label", "current", "high", "critical"))
+_Frequency = namedtuple("_Frequency", ("current", "min", "max"))
+_DiskUsage = namedtuple("_DiskUsage", ("total", "used", "free", "percent"))
+_Address = namedtuple("_Address", ("family", "address", "netmask", "broadcast", "ptp"))
+
+
+class Gpio(types.ModuleType):
+    """Mocked RPi.GPIO backend, which counts the writes to each pin instead of
+    driving any hardware."""
+
+    BCM = 11
+    OUT = 0
+
+    def __init__(self):
+        """Create an idle GPIO backend."""
+
+        super().__init__("RPi.GPIO")
+        self.writes = {}
+
+    def setmode(self, mode: int):
+        """Ignore the pin numbering system."""
+
+    def setwarnings(self, flag: bool):
+        """Ignore the warnings configuration."""
+
+    def setup(self, pin: int, direction: int):
+        """Start counting the writes to a pin."""
+
+        self.writes.setdefault(pin, [0, 0])
+
+    def output(self, pin: int, value: Any):
+        """Count a low or high write to a pin."""
+
+        self.writes[pin][1 if value else 0] += 1
+
+    def cleanup(self):
+        """Ignore the cleanup of the pins."""
+
+    def reset(self):
+        """Forget all the writes counted so far."""
+
+        for pin in self.writes:
+            self.writes[pin] = [0, 0]
+
+    def pulses(self, pin: int) -> int:
+        """Get how many times a pin was set high.
+
+        Args:
+            pin: the pin to check
+
+        Returns:
+            An integer with the number of high writes since the last reset
+        """
+
+        return self.writes.get(pin, [0, 0])[1]
+
+
+class Fixture:
+    """Replays a fixture of the profiler's data sources, either recorded or
+    synthetic.
+
+    A fixture is a directory with one numbered sub directory per frame. Each
+    frame holds a copy of the relevant /proc files, which psutil reads through
+    its PROCFS_PATH, and a sys.json file for the sources that don't live under
+    /proc (temperature, frequency, disk usage and interface addresses).
+
+    Synthetic processes can be added on top of the fixture's own, to measure the
+    process profiler on a busy system.
+    """
+
+    def __init__(self, name: str, processes: int = 0):
+        """Load the fixture with the given name.
+
+        Args:
+            name: the name of a directory under res/fixtures/, or a path to a
+            fixture directory
+            processes: how many synthetic processes to add to every frame
+        """
+
+        path = name if os.path.isdir(name) else os.path.join(_FIXTURES, name)
+        if not os.path.isdir(path):
+            raise ValueError(f"Invalid fixture '{name}' (expected one of {sorted(os.listdir(_FIXTURES))})")
+
+        self._name = os.path.basename(os.path.normpath(path))
+        self._frames = sorted((os.path.join(path, frame) for frame in os.listdir(path) if frame.isdigit()),
+                              key=lambda frame: int(os.path.basename(frame)))
+        if not self._frames:
+            raise ValueError(f"Fixture '{name}' has no frames")
+
+        self._data = []
+        for frame in self._frames:
+            with open(os.path.join(frame, "sys.json")) as file:
+                self._data.append(json.load(file))
+
+        self._processes = processes
+        self._index = 0
+
+    @property
+    def name(self) -> str:
+        """Get the name of the fixture."""
+
+        return self._name
+
+    @property
+    def frames(self) -> int:
+        """Get the number of frames."""
+
+        return len(self._frames)
+
+    @property
+    def processes(self) -> int:
+        """Get the number of synthetic processes added to every frame."""
+
+        return self._processes
+
+    @property
+    def paths(self) -> List[str]:
+        """Get the disk paths recorded in the fixture.
+
+        Returns:
+            A list with the recorded mount points, in the order they were
+            recorded
+        """
+
+        return list(self._data[0]["disks"])
+
+    @property
+    def interfaces(self) -> List[str]:
+        """Get the network interfaces recorded in the fixture.
+
+        Returns:
+            A list with the recorded interface names, in the order they were
+            recorded
+        """
+
+        return list(self._data[0]["addresses"])
+
+    def advance(self):
+        """Move on to the next frame, wrapping around after the last one."""
+
+        self._index = (self._index + 1) % len(self._frames)
+        psutil.PROCFS_PATH = os.path.join(self._frames[self._index], "proc")
+
+    def patch(self) -> ExitStack:
+        """Redirect psutil to the fixture data.
+
+        Returns:
+            A context manager that restores psutil on exit
+        """
+
+        stack = ExitStack()
+        if self._processes:
+            # Work on a copy of the frames, to leave the fixture untouched
+            frames = self._frames
+            path = stack.enter_context(tempfile.TemporaryDirectory())
+            self._frames = [shutil.copytree(frame, os.path.join(path, os.path.basename(frame))) for frame in frames]
+            stack.callback(setattr, self, "_frames", frames)
+            self._populate()
+
+        stack.enter_context(mock.patch.object(psutil, "PROCFS_PATH", os.path.join(self._frames[0], "proc")))
+        stack.enter_context(mock.patch.object(psutil, "sensors_temperatures", self._temperatures))
+        stack.enter_context(mock.patch.object(psutil, "cpu_freq", self._frequency))
+        stack.enter_context(mock.patch.object(psutil, "disk_usage", self._disk_usage))
+        stack.enter_context(mock.patch.object(psutil, "net_if_addrs", self._addresses))
+
+        # The recorded disks may not exist on this system
+        exists = os.path.exists
+        stack.enter_context(mock.patch("os.path.exists", lambda path: path in self.paths or exists(path)))
+        self._index = 0
+
+        return stack
+
+    def _populate(self):
+        """Add the synthetic processes to every frame.
+
+        Processes accumulate CPU time from frame to frame, and a few of them are
+        replaced by new ones on every frame, reusing the pid.
+        """
+
+        generator = random.Random(self._processes)
+        processes = [[10000 + pid, 0, 0, generator.randrange(64, 16384)] for pid in range(self._processes)]
+        for n, frame in enumerate(self._frames):
+            for process in processes:
+                if generator.random() < 0.02:
+                    process[1:] = [n + 1, 0, generator.randrange(64, 16384)]
+                process[2] += generator.choice((0, 0, 0, 1, 5, 50))
+
+                pid, start, ticks, rss = process
+                os.makedirs(os.path.join(frame, "proc", str(pid)), exist_ok=True)
+                with open(os.path.join(frame, "proc", str(pid), "stat"), "w") as file:
+                    file.write(f"{pid} (worker {pid}) S 1 {pid} {pid} 0 -1 4194560 120 0 0 0 {ticks} {ticks // 4} " +
+                               f"0 0 20 0 1 0 {start} {rss * 4096} {rss} 18446744073709551615 0 0 0 0 0 0 0 0\n")
+                with open(os.path.join(frame, "proc", str(pid), "cmdline"), "w") as file:
+                    file.write(f"/usr/bin/worker\0--id\0{pid}\0")
+
+    def _temperatures(self, fahrenheit: bool = False) -> Dict[str, List[_Temperature]]:
+        """Stand in for psutil.sensors_temperatures with the current frame.
+
+        Args:
+            fahrenheit: unused, temperatures are always in celsius
+
+        Returns:
+            A dictionary with the recorded CPU temperature as its only sensor
+        """
+
+        return {"cpu-thermal": [_Temperature("", self._data[self._index]["temperature"], None, None)]}
+
+    def _frequency(self, percpu: bool = False) -> _Frequency:
+        """Stand in for psutil.cpu_freq with the current frame.
+
+        Args:
+            percpu: unused, only the overall frequency is recorded
+
+        Returns:
+            A named tuple with the recorded CPU frequency, in MHz
+        """
+
+        return _Frequency(self._data[self._index]["frequency"], 0.0, 0.0)
+
+    def _disk_usage(self, path: str) -> _DiskUsage:
+        """Stand in for psutil.disk_usage with the current frame.
+
+        Args:
+            path: a mount point recorded in the fixture
+
+        Returns:
+            A named tuple with the recorded total, used, and free space, in
+            Bytes, and the space usage
+        """
+
+        usage = self._data[self._index]["disks"][path]
+        return _DiskUsage(usage["total"], usage["used"], usage["free"], 100 * usage["used"] / usage["total"])
+
+    def _addresses(self) -> Dict[str, List[_Address]]:
+        """Stand in for psutil.net_if_addrs with the current frame.
+
+        Returns:
+            A dictionary with the recorded network interfaces as keys and lists
+            of their addresses as values
+        """
+
+        return {interface: [_Address(getattr(socket, family), *rest) for family, *rest in addresses]
+                for interface, addresses in self._data[self._index]["addresses"].items()}
+
+    @staticmethod
+    def record(name: str, frames: int = 4, dt: float = 2,
+               paths: List[str] = ("/",), network_interfaces: List[str] = ("eth0", "wlan0")):
+        """Record a new fixture from the running system.
+
+        Args:
+            name: the name of the directory under res/fixtures/ to record into
+            frames: how many frames to record
+            dt: seconds between frames
+            paths: the disk paths to record
+            network_interfaces: the network interfaces to record
+        """
+
+        # Only record what can be replayed
+        for disk in paths:
+            if not os.path.exists(disk):
+                raise ValueError(f"Invalid path '{disk}' (expected one of " +
+                                 f"{[partition.mountpoint for partition in psutil.disk_partitions()]})")
+        for interface in network_interfaces:
+            if interface not in psutil.net_io_counters(pernic=True):
+                raise ValueError(f"Invalid network interface name '{interface}' (expected one of " +
+                                 f"{list(psutil.net_io_counters(pernic=True).keys())})")
+
+        path = os.path.join(_FIXTURES, name)
+        for n in range(frames):
+            logger.info(f"Recording frame {n + 1}/{frames}")
+
+            frame = os.path.join(path, str(n))
+            for file in _PROC_FILES:
+                os.makedirs(os.path.dirname(os.path.join(frame, "proc", file)), exist_ok=True)
+                shutil.copyfile(os.path.join("/proc", file), os.path.join(frame, "proc", file))
+
+            for pid in filter(str.isdigit, os.listdir("/proc")):
+                try:
+                    os.makedirs(os.path.join(frame, "proc", pid), exist_ok=True)
+                    for file in ("stat", "cmdline"):
+                        shutil.copyfile(os.path.join("/proc", pid, file), os.path.join(frame, "proc", pid, file))
+                except OSError:  # The process finished while copying it
+                    shutil.rmtree(os.path.join(frame, "proc", pid), ignore_errors=True)
+
+            temperatures = psutil.sensors_temperatures().get("cpu-thermal", [])
+            addresses = psutil.net_if_addrs()
+            data = {
+                "temperature": temperatures[0].current if temperatures else 0.0,
+                "frequency": psutil.cpu_freq().current,
+                "disks": {disk: {"total": usage.total, "used": usage.used, "free": usage.free}
+                          for disk, usage in ((disk, psutil.disk_usage(disk)) for disk in paths)},
+                "addresses": {interface: [[address.family.name, address.address, address.netmask,
+                                           address.broadcast, address.ptp]
+                                          for address in addresses.get(interface, [])]
+                              for interface in network_interfaces},
+            }
+            with open(os.path.join(frame, "sys.json"), "w") as file:
+                json.dump(data, file, indent=2)
+
+            if n < frames - 1:
+                sleep(dt)
+
+
+def _measure(function: Callable[[], Any], iterations: int,
+             setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """Time repeated calls to a function.
+
+    Args:
+        function: the function to be timed
+        iterations: how many times to call it
+        setup: a function to call before every call, which isn't timed
+
+    Returns:
+        A dictionary with the mean, median, standard deviation, minimum and
+        maximum time per call, in seconds
+    """
+
+    timings = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+
+    return {"mean": statistics.mean(timings),
+            "median": statistics.median(timings),
+            "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "min": min(timings),
+            "max": max(timings)}
+
+
+def run(fixture: str = "rpi4b-synthetic", iterations: int = 100, processes: int = 320,
+        path: Optional[str] = None, interface: Optional[str] = None) -> Dict[str, Any]:
+    """Benchmark the sample, render and bus pipeline against a fixture.
+
+    Args:
+        fixture: the name of the fixture to replay
+        iterations: how many times to measure each step
+        processes: how many synthetic processes to add to the fixture
+        path: the recorded disk path to show, or None for the first one
+        interface: the recorded network interface to show, or None for the
+        first one
+
+    Returns:
+        A dictionary with the results, ready to be serialised to JSON
+    """
+
+    fixture = Fixture(fixture, processes)
+    path = path if path is not None else fixture.paths[0]
+    interface = interface if interface is not None else fixture.interfaces[0]
+    if path not in fixture.paths:
+        raise ValueError(f"Invalid path '{path}' (expected one of {fixture.paths})")
+    if interface not in fixture.interfaces:
+        raise ValueError(f"Invalid network interface name '{interface}' (expected one of {fixture.interfaces})")
+
+    gpio = Gpio()
+
+    with ExitStack() as stack:
+        stack.enter_context(fixture.patch())
+
+        # Swap in the mocked GPIO backend and fake the drivers being present while loading the display module
+        rpi = types.ModuleType("RPi")
+        rpi.GPIO = gpio
+        stack.enter_context(mock.patch.dict(sys.modules, {"RPi": rpi, "RPi.GPIO": gpio}))
+        exists = os.path.exists
+        with mock.patch("os.path.exists", lambda path: path == _GPIO_DRIVERS or exists(path)):
+            sys.modules.pop("lcd2004", None)
+            import lcd2004
+
+        import main
+        from profiling import System
+
+        # Show the recorded disk and network interface, restoring the configuration afterwards
+        stack.enter_context(mock.patch.multiple(main, path=path, interface=interface))
+        profiler = System(paths=fixture.paths, network_interfaces=fixture.interfaces)
+        display = lcd2004.Display()
+
+        metrics = {
+            "uptime": lambda: profiler.uptime,
+            "cpu.temperature": lambda: profiler.cpu.temperature,
+            "cpu.frequency": lambda: profiler.cpu.frequency,
+            "cpu.usage": lambda: profiler.cpu.usage,
+            "ram.usage": lambda: profiler.ram.usage,
+            "disk.usage": lambda: profiler.disks[path].usage,
+            "network.sent": lambda: profiler.networks[interface].sent,
+            "network.received": lambda: profiler.networks[interface].received,
+            "network.ipv4": lambda: profiler.networks[interface].ipv4,
+            "processes.update": lambda: profiler.processes.update(),
+            "processes.top": lambda: profiler.processes.top(),
+        }
+        sampling = {name: _measure(metric, iterations, fixture.advance) for name, metric in metrics.items()}
+
+        # Render without touching the bus, to isolate the cost of sampling and formatting
+        frames = []
+        render = _measure(lambda: main.update(profiler, types.SimpleNamespace(display=frames.append)),
+                          iterations, fixture.advance)
+
+        # Send the last rendered frame, counting the bytes pulsed through the enable line
+        gpio.reset()
+        display.display(frames[-1])
+        bytes_per_frame = gpio.pulses(lcd2004.Display._ENABLE)
+        bus = _measure(lambda: display.display(frames[-1]), iterations)
+
+        tick = _measure(lambda: main.update(profiler, display), iterations, fixture.advance)
+
+        del display
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "psutil": psutil.__version__,
+        "fixture": fixture.name,
+        "frames": fixture.frames,
+        "path": path,
+        "interface": interface,
+        "processes": profiler.processes.count,
+        "iterations": iterations,
+        "sampling": sampling,
+        "render": render,
+        "display": {"bytes": bytes_per_frame, "bus": bus},
+        "tick": tick,
+    }
+
+
+if __name__ == "__main__":
+    # Run the benchmarks, or record a new fixture
+
+    import argparse
+
+    logging.getLogger().setLevel(logging.NOTSET)
+    console = logging.StreamHandler(sys.stderr)  # Keep the console output for the results
+    console.setLevel(logging.INFO)
+    console.setFormatter(logging.Formatter("[{levelname:s}] {message:s}", style="{"))
+    logging.getLogger().addHandler(console)
+
+    parser = argparse.ArgumentParser(description="Benchmark the profiler and display pipeline.")
+    parser.add_argument("--fixture", help="fixture to replay (default rpi4b-synthetic), or to record into")
+    parser.add_argument("--iterations", type=int, default=100, help="measurements per step")
+    parser.add_argument("--processes", type=int, default=320, help="synthetic processes to add to the fixture")
+    parser.add_argument("--output", help="file to write the JSON results to, instead of the console")
+    parser.add_argument("--record", type=int, metavar="FRAMES", help="record a fixture from this system instead")
+    parser.add_argument("--path", action="append",
+                        help="disk path to record (default '/'), or to show (default the first recorded one)")
+    parser.add_argument("--interface", action="append",
+                        help="network interface to record (default eth0, wlan0), " +
+                             "or to show (default the first recorded one)")
+    arguments = parser.parse_args()
+
+    if arguments.record:
+        if arguments.fixture is None:
+            parser.error("--record requires --fixture")
+
+        Fixture.record(arguments.fixture, arguments.record,
+                       paths=arguments.path or ("/",), network_interfaces=arguments.interface or ("eth0", "wlan0"))
+        sys.exit()
+
+    results = json.dumps(run(arguments.fixture or "rpi4b-synthetic", arguments.iterations, arguments.processes,
+                             path=arguments.path[0] if arguments.path else None,
+                             interface=arguments.interface[0] if arguments.interface else None), indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(results + "\n")
+    else:
+        print(results)
@@ -4,30 +4,33 @@
 import logging.handlers
 import logging
 import os
+import signal
 import sys
 
 from apscheduler.schedulers.blocking import BlockingScheduler
 
-path = os.path.dirname(__file__)
+if __name__ == "__main__":
+    # Only configure logging when running as a program, so that the module can be imported (e.g. for benchmarking)
+    path = os.path.dirname(__file__)
 
-logging.getLogger().setLevel(logging.NOTSET)
-logging.captureWarnings(False)
+    logging.getLogger().setLevel(logging.NOTSET)
+    logging.captureWarnings(False)
 
-# Silence scheduling messages
-logging.getLogger("apscheduler.scheduler").setLevel(logging.ERROR)
+    # Silence scheduling messages
+    logging.getLogger("apscheduler.scheduler").setLevel(logging.ERROR)
 
-console = logging.StreamHandler(sys.stdout)
-console.setLevel(logging.INFO)
-console.setFormatter(logging.Formatter("[{levelname:s}] {message:s}", style="{"))
-logging.getLogger().addHandler(console)
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(logging.INFO)
+    console.setFormatter(logging.Formatter("[{levelname:s}] {message:s}", style="{"))
+    logging.getLogger().addHandler(console)
 
-if not os.path.exists(os.path.join(os.path.dirname(__file__), "res/logs/")):
-    os.makedirs(os.path.join(os.path.dirname(__file__), "res/logs/"))
-file = logging.handlers.RotatingFileHandler(filename=os.path.join(path, "res/logs/lcd.log"),
-                                            maxBytes=1 << 20, backupCount=10)
-file.setLevel(logging.DEBUG)
-file.setFormatter(logging.Formatter("[{levelname:s}]({asctime:s} {name:s}) {message:s}", style="{"))
-logging.getLogger().addHandler(file)
+    if not os.path.exists(os.path.join(os.path.dirname(__file__), "res/logs/")):
+        os.makedirs(os.path.join(os.path.dirname(__file__), "res/logs/"))
+    file = logging.handlers.RotatingFileHandler(filename=os.path.join(path, "res/logs/lcd.log"),
+                                                maxBytes=1 << 20, backupCount=10)
+    file.setLevel(logging.DEBUG)
+    file.setFormatter(logging.Formatter("[{levelname:s}]({asctime:s} {name:s}) {message:s}", style="{"))
+    logging.getLogger().addHandler(file)
 
 logger = logging.getLogger(__file__)
 logger.info("Initialising program")
@@ -36,11 +39,22 @@ from datetime import datetime
 
 from lcd2004 import Display
 from profiling import System
+from smoothing import Ewma, Filter, PeakHold, Rolling
 
 # Configuration
 dt = 2  # Seconds between updates
-max_speed = 82 * 1024 * 1024  # 82 MiB/s, from empirical data
+max_speed = 82 * 1024 * 1024  # 82 MiB/s, from empirical data, or None to scale to the observed peak instead
+min_speed = 1024 * 1024  # 1 MiB/s, the lowest the observed peak scales down to, so idle traffic doesn't fill the bar
 path = "/path/to/mount/point"  # Drive to profile
+interface = "eth0"  # Network interface to profile
+record = None  # File to record the profiler readings into, for replaying them later (e.g. "res/lcd.jsonl.gz")
+smoothing = {  # How each metric is smoothed before showing it (Filter() shows the latest value as is)
+    "temperature": Filter(),
+    "cpu": Ewma(alpha=0.5),
+    "network": Rolling(ticks=3, statistic="mean"),
+    "disk": Filter(),
+}
+peak = PeakHold(decay=0.95, hold=30)  # Observed network peak, used when max_speed is None
 
 
 def update(profiler: System, display: Display):
@@ -56,15 +70,22 @@ def update(profiler: System, display: Display):
     cpu_temperature = profiler.cpu.temperature
     cpu_usage = profiler.cpu.usage
     disk_usage = profiler.disks[path].usage
-    network_usage = (profiler.networks["eth0"].sent + profiler.networks["eth0"].received) / dt  # B/s
-    ipv4 = profiler.networks["eth0"].ipv4
+    network_usage = (profiler.networks[interface].sent + profiler.networks[interface].received) / dt  # B/s
+    ipv4 = profiler.networks[interface].ipv4
+    profiler.flush()  # Keep the recording, if any, readable up to this tick
 
     logger.debug(f"TEMPERATURE {cpu_temperature:.1f}°C " +
                  f"CPU {cpu_usage}% " +
                  f"DISK {disk_usage}% " +
                  f"NETWORK {network_usage} B/s")
 
-    network_usage = 100 * min(network_usage / max_speed, 1)  # %
+    cpu_temperature = smoothing["temperature"].update(cpu_temperature)
+    cpu_usage = smoothing["cpu"].update(cpu_usage)
+    disk_usage = smoothing["disk"].update(disk_usage)
+    network_usage = smoothing["network"].update(network_usage)
+
+    scale = max_speed if max_speed is not None else max(peak.update(network_usage), min_speed)
+    network_usage = 100 * min(network_usage / scale, 1)  # %
 
     lines = [f"{cpu_temperature:3.1f}C{ipv4:>15s}",
              "C" + "\u00FF" * round(19 * cpu_usage / 100),
@@ -75,18 +96,25 @@ def update(profiler: System, display: Display):
     logger.debug("Updated@" + datetime.now().isoformat())
 
 
-# Create a display and profiler and schedule it to update indefinitely
-profiler = System(paths=(path,))
-display = Display()
-scheduler = BlockingScheduler()
+if __name__ == "__main__":
+    # Create a display and profiler and schedule it to update indefinitely
+    if record is not None:
+        # Relative to the program, like the logs
+        record = os.path.join(os.path.dirname(__file__), record)
+
+    profiler = System(paths=(path,), network_interfaces=(interface,), record=record)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit())  # Stop cleanly when killed
+    display = Display()
+    scheduler = BlockingScheduler()
 
-try:
-    scheduler.add_job(update, args=(profiler, display), trigger="cron", second=f"*/{int(dt)}")
-    scheduler.start()
+    try:
+        scheduler.add_job(update, args=(profiler, display), trigger="cron", second=f"*/{int(dt)}")
+        scheduler.start()
 
-except (KeyboardInterrupt, SystemExit) as cause:
-    logger.exception(cause)
+    except (KeyboardInterrupt, SystemExit) as cause:
+        logger.exception(cause)
 
-finally:
-    scheduler.shutdown()
-    logging.shutdown()
+    finally:
+        scheduler.shutdown()
+        profiler.close()
+        logging.shutdown()
@@ -6,25 +6,56 @@ import logging
 logger = logging.getLogger(__file__)
 logger.info("Loading system profiling module")
 
+from collections import deque
 from datetime import timedelta
+import errno
+import gzip
+import heapq
+import json
 import os
 import psutil
-from socket import AF_INET, AF_INET6, AF_PACKET
-from time import time
-from typing import Any, Dict, List, Tuple, Union
+from socket import AF_INET, AF_INET6, AF_NETLINK, AF_PACKET, NETLINK_ROUTE, SOCK_RAW, socket
+import struct
+import threading
+from time import monotonic, sleep, time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
 
 
 class System:
     """Interfacing class for RPi system profiling."""
 
     def __init__(self, paths: Union[Tuple[str], List[str]] = ("/",),
-                 network_interfaces: Union[Tuple[str], List[str]] = ("wlan0", "eth0")):
-        """Ready components for reporting information."""
+                 network_interfaces: Union[Tuple[str], List[str]] = ("wlan0", "eth0"),
+                 record: Optional[str] = None, replay: Optional[str] = None, speed: Optional[float] = None):
+        """Ready components for reporting information.
 
-        self._cpu = self._Cpu()
-        self._ram = self._Ram()
-        self._disks = {path: self._Disk(path) for path in paths}
-        self._networks = {interface: self._Network(interface) for interface in network_interfaces}
+        Args:
+            paths: the mount points of the partitions to be profiled
+            network_interfaces: the names of the network interfaces to be
+            profiled
+            record: a file to stream every reading from the system into, to be
+            replayed later
+            replay: a file with recorded readings, to be used instead of the
+            system's
+            speed: how many times faster than real time the recorded readings
+            are replayed, or None to replay them as fast as they are requested
+        """
+
+        if record is not None and replay is not None:
+            raise ValueError("Cannot record and replay at the same time")
+
+        if replay is not None:
+            self._source = self._Replay(replay, speed)
+        elif record is not None:
+            self._source = self._Recorder(record)
+        else:
+            self._source = self._Source()
+
+        self._cpu = self._Cpu(self._source)
+        self._ram = self._Ram(self._source)
+        self._disks = {path: self._Disk(self._source, path) for path in paths}
+        self._networks = {interface: self._Network(self._source, interface) for interface in network_interfaces}
+        self._processes = self._Processes(self._source)
 
     @property
     def cpu(self) -> "_Cpu":
@@ -68,6 +99,16 @@ class System:
 
         return self._networks
 
+    @property
+    def processes(self) -> "_Processes":
+        """Get the reports for the running processes.
+
+        Returns:
+            An object with the information on the processes
+        """
+
+        return self._processes
+
     @property
     def uptime(self) -> float:
         """Get the total system uptime.
@@ -76,14 +117,33 @@ class System:
             A float with the time since boot, in seconds
         """
 
-        return time() - psutil.boot_time()
+        return self._source.time() - self._source.boot_time()
+
+    def flush(self) -> "System":
+        """Write out the readings recorded so far, if recording.
+
+        This is meant to be called once per tick, so that a recording is
+        readable up to the last tick even if the program is killed.
+
+        Returns:
+            self
+        """
+
+        self._source.flush()
+
+        return self
+
+    def close(self):
+        """Finish the recording, if recording."""
+
+        self._source.close()
 
     def __str__(self) -> str:
         """Get a human readable string representation of the system profiler.
 
         Returns:
             A string with the information on the system uptime, CPU, RAM, disks,
-            and network interfaces
+            network interfaces, and processes
         """
 
         return "System {" + \
@@ -91,7 +151,8 @@ class System:
                f"{str(self.cpu)}, " + \
                f"{str(self.ram)}, " + \
                f"[{', '.join(str(disk) for disk in self.disks.values())}], " + \
-               f"[{', '.join(str(network) for network in self.networks.values())}]" + \
+               f"[{', '.join(str(network) for network in self.networks.values())}], " + \
+               f"{str(self.processes)}" + \
                "}"
 
     def __repr__(self) -> str:
@@ -100,7 +161,7 @@ class System:
 
         Returns:
             A string with the information on the system uptime, CPU, RAM, disks,
-            and network interfaces
+            network interfaces, and processes
         """
 
         return "System{" + \
@@ -108,12 +169,445 @@ class System:
                f"{repr(self.cpu)}," + \
                f"{repr(self.ram)}," + \
                f"[{','.join(repr(disk) for disk in self.disks.values())}]," + \
-               f"[{','.join(repr(network) for network in self.networks.values())}]" + \
+               f"[{','.join(repr(network) for network in self.networks.values())}]," + \
+               f"{repr(self.processes)}" + \
                "}"
 
+    class _Source:
+        """Live source of readings, straight from the system."""
+
+        _CLOCK_TICKS: int = os.sysconf("SC_CLK_TCK")
+        """Kernel clock ticks per second, the unit of process CPU times."""
+        _PAGE_SIZE: int = os.sysconf("SC_PAGE_SIZE")
+        """Size of a memory page, the unit of process resident memory."""
+
+        _REVALIDATE: float = 60
+        """Seconds after which network addresses are read again, in case a
+        change was missed.
+        """
+        _RTMGRP_ADDRESSES: int = 0x10 | 0x100
+        """Netlink groups notified of IPv4 and IPv6 address changes."""
+        _RTM_ADDRESSES: Tuple[int] = (20, 21)
+        """Netlink message types for new and deleted addresses."""
+
+        _listener: Optional[threading.Thread] = None
+        """Thread listening for network address changes, shared by all sources."""
+        _changes: int = 0
+        """Number of network address changes reported by the kernel."""
+
+        def time(self) -> float:
+            """Get the current time.
+
+            Returns:
+                A float with the time, in seconds since the epoch
+            """
+
+            return self._read("time", time)
+
+        def monotonic(self) -> float:
+            """Get the current time of a clock that never goes back, unlike the
+            system time, which can be changed (e.g. by NTP).
+
+            Returns:
+                A float with the time, in seconds since an unspecified point
+            """
+
+            return self._read("monotonic", monotonic)
+
+        def boot_time(self) -> float:
+            """Get the system boot time.
+
+            Returns:
+                A float with the boot time, in seconds since the epoch
+            """
+
+            return self._read("boot_time", psutil.boot_time)
+
+        def temperature(self) -> float:
+            """Get the current temperature of the CPU.
+
+            Returns:
+                A float with the temperature, in celsius
+            """
+
+            return self._read("temperature", lambda: psutil.sensors_temperatures()["cpu-thermal"][0].current)
+
+        def frequency(self) -> float:
+            """Get the current CPU frequency.
+
+            Returns:
+                A float with the frequency, in MHz
+            """
+
+            return self._read("frequency", lambda: psutil.cpu_freq().current)
+
+        def cpu_usage(self) -> float:
+            """Get the CPU utilisation since the last call.
+
+            Returns:
+                A float with the percentage of the CPU utilisation, across all
+                cores
+            """
+
+            return self._read("cpu_usage", psutil.cpu_percent)
+
+        def memory(self) -> Tuple[int, int, int]:
+            """Get the system memory.
+
+            Returns:
+                A tuple with the total, available, and used system memory, in
+                Bytes
+            """
+
+            def reader():
+                memory = psutil.virtual_memory()
+                return memory.total, memory.available, memory.used
+
+            return self._read("memory", reader)
+
+        def exists(self, path: str) -> bool:
+            """Check whether a path exists.
+
+            Args:
+                path: the path to be checked
+
+            Returns:
+                True if the path exists, False otherwise
+            """
+
+            return self._read(f"exists:{path}", lambda: os.path.exists(path))
+
+        def partitions(self) -> List[str]:
+            """Get the mounted partitions.
+
+            Returns:
+                A list with the mount point of every partition
+            """
+
+            return self._read("partitions", lambda: [partition.mountpoint for partition in psutil.disk_partitions()])
+
+        def disk_usage(self, path: str) -> Tuple[int, int, int]:
+            """Get the space of a partition.
+
+            Args:
+                path: a path to mount point of the partition
+
+            Returns:
+                A tuple with the total, free, and used space of the partition,
+                in Bytes
+            """
+
+            def reader():
+                usage = psutil.disk_usage(path)
+                return usage.total, usage.free, usage.used
+
+            return self._read(f"disk_usage:{path}", reader)
+
+        def interfaces(self) -> List[str]:
+            """Get the network interfaces.
+
+            Returns:
+                A list with the name of every network interface
+            """
+
+            return self._read("interfaces", lambda: list(psutil.net_if_addrs().keys()))
+
+        def addresses(self, name: str) -> List[Tuple[int, str]]:
+            """Get the addresses of a network interface.
+
+            Args:
+                name: the name of the network interface
+
+            Returns:
+                A list with the family and address of every address of the
+                network interface
+            """
+
+            return self._read(f"addresses:{name}",
+                              lambda: [(int(x.family), x.address) for x in psutil.net_if_addrs()[name]])
+
+        def address_changes(self) -> int:
+            """Get how many times the network addresses may have changed.
+
+            The count increases when the kernel reports a change, and also
+            periodically, in case a change was missed.
+
+            Returns:
+                An integer that increases whenever the network addresses may have
+                changed
+            """
+
+            def reader():
+                if System._Source._listener is None:
+                    System._Source._listener = threading.Thread(target=System._Source._listen, name="netlink",
+                                                                daemon=True)
+                    System._Source._listener.start()
+
+                return System._Source._changes + int(monotonic() // self._REVALIDATE)
+
+            return self._read("address_changes", reader)
+
+        def io_counters(self, name: str) -> Tuple[int, int]:
+            """Get the traffic of a network interface.
+
+            Args:
+                name: the name of the network interface
+
+            Returns:
+                A tuple with the total Bytes sent and received by the network
+                interface
+            """
+
+            def reader():
+                counters = psutil.net_io_counters(pernic=True, nowrap=True)[name]
+                return counters.bytes_sent, counters.bytes_recv
+
+            return self._read(f"io_counters:{name}", reader)
+
+        def processes(self) -> List[Tuple[int, int, float, int]]:
+            """Get the state of every process.
+
+            Returns:
+                A list with the pid, start time (in clock ticks since boot), CPU
+                time (in seconds), and resident memory (in Bytes) of every
+                process
+            """
+
+            def reader():
+                processes = []
+                for pid in os.listdir(psutil.PROCFS_PATH):
+                    if not pid.isdigit():
+                        continue
+
+                    try:
+                        with open(f"{psutil.PROCFS_PATH}/{pid}/stat", "rb") as file:
+                            stat = file.read()
+                    except OSError:  # The process finished while listing them
+                        continue
+
+                    # Skip the name, which can contain spaces and parentheses
+                    fields = stat[stat.rfind(b")") + 2:].split()
+                    processes.append((int(pid), int(fields[19]),
+                                      (int(fields[11]) + int(fields[12])) / self._CLOCK_TICKS,
+                                      int(fields[21]) * self._PAGE_SIZE))
+
+                return processes
+
+            return self._read("processes", reader)
+
+        def process(self, pid: int) -> Optional[Tuple[str, str]]:
+            """Get the static information of a process.
+
+            Args:
+                pid: the id of the process
+
+            Returns:
+                A tuple with the name and command line of the process, or None
+                if it has finished
+            """
+
+            def reader():
+                try:
+                    with open(f"{psutil.PROCFS_PATH}/{pid}/stat", "rb") as file:
+                        stat = file.read()
+                    with open(f"{psutil.PROCFS_PATH}/{pid}/cmdline", "rb") as file:
+                        cmdline = file.read()
+                except OSError:
+                    return None
+
+                return (stat[stat.find(b"(") + 1:stat.rfind(b")")].decode(errors="replace"),
+                        cmdline.replace(b"\0", b" ").strip().decode(errors="replace"))
+
+            return self._read(f"process:{pid}", reader)
+
+        @staticmethod
+        def _listen():
+            """Count the network address changes reported by the kernel, until
+            the listening fails.
+            """
+
+            try:
+                with socket(AF_NETLINK, SOCK_RAW, NETLINK_ROUTE) as connection:
+                    connection.bind((0, System._Source._RTMGRP_ADDRESSES))
+
+                    while True:
+                        try:
+                            data = connection.recv(1 << 16)
+                        except OSError as cause:
+                            if cause.errno != errno.ENOBUFS:
+                                raise
+
+                            # Messages were dropped, assume some were changes
+                            System._Source._changes += 1
+                            continue
+
+                        offset = 0
+                        while offset + 16 <= len(data):
+                            length, kind = struct.unpack_from("=LH", data, offset)
+                            if kind in System._Source._RTM_ADDRESSES:
+                                System._Source._changes += 1
+                                break
+
+                            if length < 16:
+                                break
+                            offset += (length + 3) & ~3  # Messages are aligned to 4 bytes
+
+            except OSError as cause:
+                logger.warning(f"Cannot listen for network address changes ({cause}), " +
+                               f"reading them every {System._Source._REVALIDATE}s instead")
+
+        def _read(self, key: str, reader: Callable[[], Any]) -> Any:
+            """Take a reading.
+
+            Args:
+                key: a name that identifies the reading, including its
+                arguments
+                reader: a function that takes the reading from the system
+
+            Returns:
+                The reading
+            """
+
+            return reader()
+
+        def flush(self):
+            """Write out the readings taken so far, which live sources don't
+            keep.
+            """
+
+        def close(self):
+            """Stop taking readings, which live sources don't need."""
+
+    class _Recorder(_Source):
+        """Source of readings from the system, which streams every reading into
+        a compressed file so that it can be replayed later.
+        """
+
+        def __init__(self, path: str):
+            """Start recording into the given file.
+
+            Args:
+                path: the file to record into, which is overwritten if it exists
+            """
+
+            logger.info(f"Recording readings into '{path}'")
+
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+            self._start = monotonic()
+
+        def __del__(self):
+            """Finish the recording."""
+
+            # The file is missing if it could not be opened
+            if getattr(self, "_file", None) is not None:
+                self._file.close()
+
+        def flush(self):
+            """Write out and compress the readings recorded so far."""
+
+            self._file.flush()
+
+        def close(self):
+            """Finish the recording."""
+
+            self._file.close()
+
+        def _read(self, key: str, reader: Callable[[], Any]) -> Any:
+            """Take a reading and record it, along with the time since the start
+            of the recording, which is measured with a monotonic clock so that
+            changes to the system clock don't affect it.
+
+            Args:
+                key: a name that identifies the reading, including its
+                arguments
+                reader: a function that takes the reading from the system
+
+            Returns:
+                The reading
+            """
+
+            value = reader()
+            offset = round(monotonic() - self._start, 6)
+            self._file.write(json.dumps([offset, key, value], separators=(",", ":")) + "\n")
+
+            return value
+
+    class _Replay(_Source):
+        """Source of readings from a recording, which are fed back in the same
+        order that they were recorded.
+        """
+
+        def __init__(self, path: str, speed: Optional[float] = None):
+            """Load the given recording.
+
+            Args:
+                path: the file with the recorded readings
+                speed: how many times faster than real time the readings are
+                replayed, or None to replay them as fast as they are requested
+            """
+
+            if speed is not None and speed <= 0:
+                raise ValueError(f"Invalid replay speed {speed} (expected a positive number)")
+
+            logger.info(f"Replaying readings from '{path}'")
+
+            self._readings: Dict[str, Deque[Tuple[float, Any]]] = {}
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                try:
+                    for line in file:
+                        offset, key, value = json.loads(line)
+                        self._readings.setdefault(key, deque()).append((offset, value))
+
+                except (EOFError, ValueError):
+                    # The recording was cut short, keep what was written in full
+                    logger.warning(f"Recording '{path}' is truncated")
+
+            self._speed = speed
+            self._start = None
+
+        def _read(self, key: str, reader: Callable[[], Any]) -> Any:
+            """Get the next recorded reading, waiting until it's due if the
+            replay is paced.
+
+            Args:
+                key: a name that identifies the reading, including its
+                arguments
+                reader: unused, the system is never read while replaying
+
+            Returns:
+                The reading
+
+            Raises:
+                EOFError: if there are no more recorded readings for the key
+            """
+
+            if not self._readings.get(key):
+                raise EOFError(f"No more recorded readings for '{key}'")
+
+            offset, value = self._readings[key].popleft()
+
+            if self._speed is not None:
+                if self._start is None:
+                    self._start = monotonic() - offset / self._speed
+
+                delay = self._start + offset / self._speed - monotonic()
+                if delay > 0:
+                    sleep(delay)
+
+            return value
+
     class _Cpu:
         """Interfacing class for CPU profiling."""
 
+        def __init__(self, source: "System._Source"):
+            """Create the profiler for the CPU.
+
+            Args:
+                source: where the readings are taken from
+            """
+
+            self._source = source
+
         @property
         def temperature(self) -> float:
             """Get the current temperature of the CPU.
@@ -122,7 +616,7 @@ class System:
                 A float with the temperature, in celsius
             """
 
-            return psutil.sensors_temperatures()["cpu-thermal"][0].current
+            return self._source.temperature()
 
         @property
         def frequency(self) -> float:
@@ -132,7 +626,7 @@ class System:
                 A float with the frequency, in GHz
             """
 
-            return psutil.cpu_freq().current / 1000
+            return self._source.frequency() / 1000
 
         @property
         def usage(self) -> float:
@@ -143,7 +637,7 @@ class System:
                 cores
             """
 
-            return psutil.cpu_percent()
+            return self._source.cpu_usage()
 
         def __str__(self) -> str:
             """Get a human readable string representation of the CPU profiler.
@@ -173,6 +667,15 @@ class System:
     class _Ram:
         """Interfacing class for RAM profiling."""
 
+        def __init__(self, source: "System._Source"):
+            """Create the profiler for the RAM.
+
+            Args:
+                source: where the readings are taken from
+            """
+
+            self._source = source
+
         @property
         def total(self) -> int:
             """Get the total available hardware memory.
@@ -181,7 +684,7 @@ class System:
                 An integer with the amount of total system memory, in Bytes
             """
 
-            return psutil.virtual_memory().total
+            return self._source.memory()[0]
 
         @property
         def free(self) -> int:
@@ -191,7 +694,7 @@ class System:
                 An integer with the amount of free system memory, in Bytes
             """
 
-            return psutil.virtual_memory().available
+            return self._source.memory()[1]
 
         @property
         def used(self) -> int:
@@ -201,7 +704,7 @@ class System:
                 An integer with the amount of used system memory, in Bytes
             """
 
-            return psutil.virtual_memory().used
+            return self._source.memory()[2]
 
         @property
         def usage(self) -> float:
@@ -246,18 +749,19 @@ class System:
     class _Disk:
         """Interfacing class for disk profiling."""
 
-        def __init__(self, path: str):
+        def __init__(self, source: "System._Source", path: str):
             """Create the profiler for the specified path.
 
             Args:
+                source: where the readings are taken from
                 path: a path to mount point of the partition to be profiled
                 (e.g. '/dev/sdx')
             """
 
-            if not os.path.exists(path):
-                raise ValueError(f"Invalid path '{path}' (expected one of " +
-                                 f"{[partition.mountpoint for partition in psutil.disk_partitions()]})")
+            if not source.exists(path):
+                raise ValueError(f"Invalid path '{path}' (expected one of {source.partitions()})")
 
+            self._source = source
             self._path = path
 
         @property
@@ -268,7 +772,7 @@ class System:
                 An integer with the total size of the partition, in Bytes
             """
 
-            return psutil.disk_usage(self._path).total
+            return self._source.disk_usage(self._path)[0]
 
         @property
         def free(self) -> int:
@@ -278,7 +782,7 @@ class System:
                 An integer with the free space of the partition, in Bytes
             """
 
-            return psutil.disk_usage(self._path).free
+            return self._source.disk_usage(self._path)[1]
 
         @property
         def used(self) -> int:
@@ -288,7 +792,7 @@ class System:
                 An integer with the used space of the partition, in Bytes
             """
 
-            return psutil.disk_usage(self._path).used
+            return self._source.disk_usage(self._path)[2]
 
         @property
         def usage(self) -> float:
@@ -334,21 +838,25 @@ class System:
     class _Network:
         """Interfacing class for network profiling."""
 
-        def __init__(self, name: str):
+        def __init__(self, source: "System._Source", name: str):
             """Create the profiler for the specified network interface.
 
             Args:
+                source: where the readings are taken from
                 name: the name of the network interface to be profiled
                 (e.g. 'eth0')
             """
 
-            if name not in psutil.net_if_addrs().keys():
-                raise ValueError(f"Invalid network interface name '{name}' (expected one of " +
-                                 f"{list(psutil.net_if_addrs().keys())})")
+            interfaces = source.interfaces()
+            if name not in interfaces:
+                raise ValueError(f"Invalid network interface name '{name}' (expected one of {interfaces})")
 
+            self._source = source
             self._name = name
             self._bytes_sent = None
             self._bytes_received = None
+            self._addresses = None
+            self._changes = None
 
         @property
         def ipv4(self) -> str:
@@ -358,8 +866,8 @@ class System:
                 A string with the address of the network interface
             """
 
-            return next(iter([x.address for x in psutil.net_if_addrs()[self._name]
-                              if x.family is AF_INET]), "N/A")
+            return next(iter([address for family, address in self._cached_addresses()
+                              if family == AF_INET]), "N/A")
 
         @property
         def ipv6(self) -> str:
@@ -369,8 +877,8 @@ class System:
                 A string with the address of the network interface
             """
 
-            return next(iter([x.address.upper() for x in psutil.net_if_addrs()[self._name]
-                              if x.family is AF_INET6]), "N/A")
+            return next(iter([address.upper() for family, address in self._cached_addresses()
+                              if family == AF_INET6]), "N/A")
 
         @property
         def mac(self) -> str:
@@ -380,8 +888,25 @@ class System:
                 A string with the address of the network interface
             """
 
-            return next(iter([x.address.upper() for x in psutil.net_if_addrs()[self._name]
-                              if x.family is AF_PACKET]), "N/A")
+            return next(iter([address.upper() for family, address in self._cached_addresses()
+                              if family == AF_PACKET]), "N/A")
+
+        def _cached_addresses(self) -> List[Tuple[int, str]]:
+            """Get the addresses of the network adapter, only reading them again
+            when they may have changed.
+
+            Returns:
+                A list with the family and address of every address of the
+                network interface
+            """
+
+            # Check for changes before reading, so that a change while reading is caught on the next call
+            changes = self._source.address_changes()
+            if changes != self._changes:
+                self._addresses = self._source.addresses(self._name)
+                self._changes = changes
+
+            return self._addresses
 
         @property
         def sent(self) -> int:
@@ -392,7 +917,7 @@ class System:
                 An integer detailing how many Bytes were sent
             """
 
-            sent = psutil.net_io_counters(pernic=True, nowrap=True)[self._name].bytes_sent
+            sent = self._source.io_counters(self._name)[0]
             if self._bytes_sent is None:
                 self._bytes_sent = sent
 
@@ -410,7 +935,7 @@ class System:
                 An integer detailing how many Bytes were received
             """
 
-            received = psutil.net_io_counters(pernic=True, nowrap=True)[self._name].bytes_sent
+            received = self._source.io_counters(self._name)[1]
             if self._bytes_received is None:
                 self._bytes_received = received
 
@@ -473,6 +998,125 @@ class System:
 
             return result
 
+    class _Processes:
+        """Interfacing class for process profiling.
+
+        Processes are kept in a table keyed by pid and start time, so that the
+        static information of each process is only read once, and every update
+        only reads its CPU time and resident memory.
+        """
+
+        def __init__(self, source: "System._Source"):
+            """Create the profiler for the running processes.
+
+            Args:
+                source: where the readings are taken from
+            """
+
+            self._source = source
+            self._table: Dict[Tuple[int, int], Dict[str, Any]] = {}
+            self._time = None
+
+        @property
+        def count(self) -> int:
+            """Get the number of processes, as of the last update.
+
+            Returns:
+                An integer with the number of running processes
+            """
+
+            return len(self._table)
+
+        def update(self) -> "System._Processes":
+            """Refresh the table with the current state of the processes.
+
+            This is meant to be called once per tick. CPU usage is measured
+            since the previous update, much like the CPU profiler does, so
+            processes first seen in this update use 0%.
+
+            Returns:
+                self
+            """
+
+            now = self._source.monotonic()
+            elapsed = now - self._time if self._time is not None else 0
+            self._time = now
+
+            table = {}
+            for pid, start, cpu_time, rss in self._source.processes():
+                process = self._table.get((pid, start))
+                if process is None:
+                    info = self._source.process(pid)
+                    if info is None:  # Already finished
+                        continue
+
+                    process = {"pid": pid, "name": info[0], "cmdline": info[1],
+                               "usage": 0.0, "time": cpu_time, "rss": rss}
+
+                else:
+                    process["usage"] = 100 * (cpu_time - process["time"]) / elapsed if elapsed > 0 else 0.0
+                    process["time"] = cpu_time
+                    process["rss"] = rss
+
+                table[(pid, start)] = process
+
+            self._table = table
+
+            return self
+
+        def top(self, n: int = 3, by: str = "cpu") -> List[Dict[str, Any]]:
+            """Get the processes using the most resources, as of the last
+            update.
+
+            Args:
+                n: how many processes to get
+                by: either 'cpu' or 'memory', the resource to sort by
+
+            Returns:
+                A list with, at most, n dictionaries with the pid, name,
+                cmdline, CPU usage (in percent of one core), CPU time (in
+                seconds), and resident memory (in Bytes) of each process, from
+                highest to lowest usage
+            """
+
+            if by not in ("cpu", "memory"):
+                raise ValueError(f"Invalid resource '{by}' (expected one of ['cpu', 'memory'])")
+
+            return [dict(process) for process in
+                    heapq.nlargest(n, self._table.values(),
+                                   key=lambda process: process["usage" if by == "cpu" else "rss"])]
+
+        def __str__(self) -> str:
+            """Get a human readable string representation of the process
+            profiler.
+
+            Returns:
+                A string with the number of processes and the top 3 by CPU
+                usage, as of the last update
+            """
+
+            top = []
+            for process in self.top(3, "cpu"):
+                rss = System._reduce(process["rss"])
+                top.append(f"{process['name']} ({process['pid']}) " +
+                           f"usage {process['usage']:.1f}% rss {rss['value']:.1f} {rss['unit']}")
+
+            return "PROCESSES {" + \
+                   f"count {self.count}, " + \
+                   f"top [{', '.join(top)}]" + \
+                   "}"
+
+        def __repr__(self) -> str:
+            """Get a detailed string representation of the current state of the
+            process profiler.
+
+            Returns:
+                A string with the number of processes and the top 3 by CPU
+                usage, as of the last update
+            """
+
+            return f"PROCESSES{{{self.count},{self.top(3, 'cpu')}}}"
+
     @staticmethod
     def _reduce(value: int) -> Dict[str, Any]:
         """Reduce the value of bytes to an appropriate unit.
@@ -503,4 +1147,8 @@ if __name__ == "__main__":
     console.setFormatter(logging.Formatter("[{levelname:s}] {message:s}", style="{"))
     logging.getLogger().addHandler(console)
 
-    logger.info(str(System()))
+    system = System()
+    system.processes.update()
+    sleep(1)  # Give the processes time to use the CPU
+    system.processes.update()
+    logger.info(str(system))
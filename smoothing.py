@@ -0,0 +1,239 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import logging
+
+logger = logging.getLogger(__file__)
+logger.info("Loading smoothing module")
+
+from collections import deque
+from typing import Optional
+
+
+class Filter:
+    """Streaming filter, which smooths a metric one sample at a time.
+
+    This filter lets every sample through as is, and is meant to be subclassed.
+    """
+
+    def __init__(self):
+        """Create an empty filter."""
+
+        self._value = None
+
+    @property
+    def value(self) -> Optional[float]:
+        """Get the latest filtered value.
+
+        Returns:
+            A float with the filtered value, or None if there were no samples
+        """
+
+        return self._value
+
+    def update(self, sample: float) -> float:
+        """Add a new sample to the filter.
+
+        Args:
+            sample: the latest value of the metric
+
+        Returns:
+            A float with the filtered value
+        """
+
+        self._value = sample
+
+        return self._value
+
+    def __str__(self) -> str:
+        """Get a human readable string representation of the filter.
+
+        Returns:
+            A string with the name and latest value of the filter
+        """
+
+        return f"{type(self).__name__.upper()} {{value {self._value}}}"
+
+    def __repr__(self) -> str:
+        """Get a detailed string representation of the current state of the
+        filter.
+
+        Returns:
+            A string with the name and latest value of the filter
+        """
+
+        return f"{type(self).__name__.upper()}{{{self._value}}}"
+
+
+class Ewma(Filter):
+    """Exponentially weighted moving average of a metric."""
+
+    def __init__(self, alpha: float):
+        """Create an empty moving average.
+
+        Args:
+            alpha: the weight of every new sample, between 0 (excluded) and 1,
+            the lower it is the smoother the average
+        """
+
+        if not 0 < alpha <= 1:
+            raise ValueError(f"Invalid weight {alpha} (expected a number in (0, 1])")
+
+        super().__init__()
+        self._alpha = alpha
+
+    def update(self, sample: float) -> float:
+        """Add a new sample to the average.
+
+        Args:
+            sample: the latest value of the metric
+
+        Returns:
+            A float with the average
+        """
+
+        if self._value is None:
+            self._value = sample
+        else:
+            self._value += self._alpha * (sample - self._value)
+
+        return self._value
+
+
+class Rolling(Filter):
+    """Minimum, maximum and mean of a metric over the latest samples.
+
+    The minimum and maximum are tracked with monotonic queues, and the mean with
+    a running sum, so updates take constant (amortised) time and the memory is
+    bounded by the size of the window.
+    """
+
+    def __init__(self, ticks: int, statistic: str = "mean"):
+        """Create an empty window.
+
+        Args:
+            ticks: how many of the latest samples are taken into account
+            statistic: either 'min', 'max', or 'mean', the statistic used as
+            the filtered value
+        """
+
+        if ticks < 1:
+            raise ValueError(f"Invalid window of {ticks} ticks (expected at least 1)")
+
+        if statistic not in ("min", "max", "mean"):
+            raise ValueError(f"Invalid statistic '{statistic}' (expected one of ['min', 'max', 'mean'])")
+
+        super().__init__()
+        self._statistic = statistic
+        self._tick = 0
+        self._samples = deque(maxlen=ticks)
+        self._sum = 0.0
+        self._minima = deque()  # (tick, sample) pairs, with increasing samples
+        self._maxima = deque()  # (tick, sample) pairs, with decreasing samples
+
+    @property
+    def min(self) -> Optional[float]:
+        """Get the minimum of the window.
+
+        Returns:
+            A float with the minimum, or None if there were no samples
+        """
+
+        return self._minima[0][1] if self._minima else None
+
+    @property
+    def max(self) -> Optional[float]:
+        """Get the maximum of the window.
+
+        Returns:
+            A float with the maximum, or None if there were no samples
+        """
+
+        return self._maxima[0][1] if self._maxima else None
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Get the mean of the window.
+
+        Returns:
+            A float with the mean, or None if there were no samples
+        """
+
+        return self._sum / len(self._samples) if self._samples else None
+
+    def update(self, sample: float) -> float:
+        """Add a new sample to the window, dropping the oldest one if full.
+
+        Args:
+            sample: the latest value of the metric
+
+        Returns:
+            A float with the chosen statistic of the window
+        """
+
+        if len(self._samples) == self._samples.maxlen:
+            self._sum -= self._samples[0]
+        self._samples.append(sample)
+        self._sum += sample
+
+        while self._minima and self._minima[-1][1] >= sample:
+            self._minima.pop()
+        self._minima.append((self._tick, sample))
+        if self._minima[0][0] <= self._tick - self._samples.maxlen:
+            self._minima.popleft()
+
+        while self._maxima and self._maxima[-1][1] <= sample:
+            self._maxima.pop()
+        self._maxima.append((self._tick, sample))
+        if self._maxima[0][0] <= self._tick - self._samples.maxlen:
+            self._maxima.popleft()
+
+        self._tick += 1
+        self._value = getattr(self, self._statistic)
+
+        return self._value
+
+
+class PeakHold(Filter):
+    """Peak of a metric, which is held for a while and then decays."""
+
+    def __init__(self, decay: float, hold: int = 0):
+        """Create an empty peak.
+
+        Args:
+            decay: the factor the peak is multiplied by on every tick after
+            being held, between 0 and 1 (excluded)
+            hold: for how many ticks the peak is kept before decaying
+        """
+
+        if not 0 <= decay < 1:
+            raise ValueError(f"Invalid decay {decay} (expected a number in [0, 1))")
+
+        if hold < 0:
+            raise ValueError(f"Invalid hold of {hold} ticks (expected at least 0)")
+
+        super().__init__()
+        self._decay = decay
+        self._hold = hold
+        self._age = 0
+
+    def update(self, sample: float) -> float:
+        """Add a new sample, which becomes the peak if it's higher.
+
+        Args:
+            sample: the latest value of the metric
+
+        Returns:
+            A float with the peak
+        """
+
+        if self._value is None or sample >= self._value:
+            self._value = sample
+            self._age = 0
+
+        else:
+            self._age += 1
+            if self._age > self._hold:
+                self._value = max(sample, self._value * self._decay)
+
+        return self._value